@@ -8,14 +8,35 @@ import time
 from datetime import datetime, timezone
 from typing import Iterable
 
+import numpy as np
+
 from auv_tracker import AuvTracker
 
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # numba is optional: run the kernels as plain Python
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda f: f
+
+
+_last_s = -1
+_last_iso = ""
+
 
 def now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+    """UTC timestamp at second resolution, reformatted only when the second changes."""
+    global _last_s, _last_iso
+    s = int(time.time())
+    if s != _last_s:
+        _last_s = s
+        _last_iso = datetime.fromtimestamp(s, timezone.utc).isoformat(timespec="seconds")
+    return _last_iso
 
 
-def step(lat: float, lon: float, heading_deg: float, distance_m: float) -> tuple[float, float]:
+def _step_exact(lat: float, lon: float, heading_deg: float, distance_m: float) -> tuple[float, float]:
     """Move along heading by distance (m) on a local tangent plane."""
     north = math.cos(math.radians(heading_deg)) * distance_m
     east = math.sin(math.radians(heading_deg)) * distance_m
@@ -25,22 +46,49 @@ def step(lat: float, lon: float, heading_deg: float, distance_m: float) -> tuple
     return lat + dlat, lon + dlon
 
 
+# heading lookup tables at 0.1 deg resolution, indexed by int(heading_deg * 10) % 3600
+_SIN = np.sin(np.radians(np.arange(3600) / 10))
+_COS = np.cos(np.radians(np.arange(3600) / 10))
+
+
+def _step_lut(lat: float, lon: float, heading_deg: float, distance_m: float) -> tuple[float, float]:
+    """_step_exact with the heading's sin/cos read from the lookup tables."""
+    i = int(heading_deg * 10) % 3600
+    north = _COS[i] * distance_m
+    east = _SIN[i] * distance_m
+    dlat = north / 111_320.0
+    dlon = east / (111_320.0 * max(0.001, math.cos(math.radians(lat))))
+    return lat + dlat, lon + dlon
+
+
+# the table lookup only pays off once compiled; as plain Python, math.cos/sin is
+# faster and returns plain floats rather than np.float64
+if HAVE_NUMBA:
+    step = njit("UniTuple(f8,2)(f8,f8,f8,f8)", cache=True, fastmath=True)(_step_lut)
+else:
+    step = _step_exact
+
+
 def make_path_ahead(lat: float, lon: float, heading_deg: float, n: int = 6, spacing_m: float = 300.0) -> list[dict]:
     """Simple straight path n points ahead."""
-    pts: list[dict] = []
-    cur_lat, cur_lon = lat, lon
-    for _ in range(n):
-        cur_lat, cur_lon = step(cur_lat, cur_lon, heading_deg, spacing_m)
-        pts.append({"lat": cur_lat, "lon": cur_lon})
-    return pts
+    # constant heading: every point is the same (dlat, dlon) offset from the previous one
+    first_lat, first_lon = step(lat, lon, heading_deg, spacing_m)
+    k = np.arange(1, n + 1)
+    lats = lat + (first_lat - lat) * k
+    lons = lon + (first_lon - lon) * k
+    return [{"lat": p_lat, "lon": p_lon} for p_lat, p_lon in zip(lats.tolist(), lons.tolist())]
+
+
+_TARGET_RADII = np.array([150.0, 250.0, 300.0, 450.0, 600.0, 900.0])
 
 
+@njit(cache=True, fastmath=True)
 def random_target_near(lat: float, lon: float, max_radius_m: float = 1500.0) -> tuple[float, float, float]:
     """Uniform random target within circle (<= max_radius_m). Returns (lat, lon, radius_m)."""
-    r = max_radius_m * math.sqrt(random.random())
-    theta = random.uniform(0, 2 * math.pi)
+    r = max_radius_m * math.sqrt(np.random.random())
+    theta = 2 * math.pi * np.random.random()
     tlat, tlon = step(lat, lon, math.degrees(theta), r)
-    radius_m = random.choice([150, 250, 300, 450, 600, 900])
+    radius_m = _TARGET_RADII[np.random.randint(0, len(_TARGET_RADII))]
     return tlat, tlon, float(radius_m)
 
 
@@ -60,7 +108,7 @@ def simulation_loop(
     tick = 0
 
     # optional initial path/target
-    tracker.set_path([{32.1020, 34.7800}, {32.1060, 34.7820}, {32.1080, 34.7800}, {32.1090, 34.7830}], mode="replace")
+    tracker.set_path([(32.1020, 34.7800), (32.1060, 34.7820), (32.1080, 34.7800), (32.1090, 34.7830)], mode="replace")
     tlat, tlon, r = random_target_near(lat, lon)
     tracker.set_target(lat=tlat, lon=tlon, radius_m=r)
 
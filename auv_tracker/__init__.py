@@ -1,9 +1,16 @@
 # /auv_tracker/__init__.py
 from __future__ import annotations
+import sys
 from typing import Any, Dict, Iterable, Optional
-from .core import StateStore, Broker, sse_wrap, Auv, Target, LatLon
+from .core import StateStore, Broker, Subscriber, sse_wrap, Auv, Target, LatLon
 from .server import create_app
 
+__all__ = [
+    "AuvTracker", "create_app",
+    "StateStore", "Broker", "Subscriber", "sse_wrap",
+    "Auv", "Target", "LatLon",
+]
+
 class AuvTracker:
     """Importable facade providing both a Python API and a Flask app."""
     def __init__(self) -> None:
@@ -17,9 +24,14 @@ class AuvTracker:
 
     def set_auv(self, *, lat: float, lon: float, alt: float | None = None,
                 heading: float | None = None, timestamp: str = "") -> None:
-        auv: Auv = {"lat": float(lat), "lon": float(lon), "alt": alt, "heading": heading, "timestamp": timestamp}
-        state = self.store.set_auv(auv)
-        self.broker.publish_str(sse_wrap(state))
+        auv: Auv = {
+            "lat": float(lat),
+            "lon": float(lon),
+            "alt": float(alt) if alt is not None else None,
+            "heading": float(heading) if heading is not None else None,
+            "timestamp": timestamp,
+        }
+        self.store.mutate_and_publish(self.broker, "auv", auv)
 
     def set_target(self, *, lat: float, lon: float, radius_m: float | None = None) -> None:
         target: Target = {"lat": float(lat), "lon": float(lon)}
@@ -27,12 +39,10 @@ class AuvTracker:
             if radius_m < 0:
                 raise ValueError("radius_m must be >= 0")
             target["radius_m"] = float(radius_m)
-        state = self.store.set_target(target)
-        self.broker.publish_str(sse_wrap(state))
+        self.store.mutate_and_publish(self.broker, "target", target)
 
     def clear_target(self) -> None:
-        state = self.store.set_target(None)
-        self.broker.publish_str(sse_wrap(state))
+        self.store.mutate_and_publish(self.broker, "target", None)
 
     def set_path(self, points: Iterable[tuple[float, float]] | Iterable[Dict[str, float]],
                  mode: str = "replace") -> None:
@@ -42,12 +52,29 @@ class AuvTracker:
         for p in points:
             if isinstance(p, dict):
                 latlons.append({"lat": float(p["lat"]), "lon": float(p["lon"])})
+            elif isinstance(p, (set, frozenset)):  # e.g. {lat, lon}: unpacking order is undefined
+                raise TypeError(f"path points must be ordered (lat, lon) pairs or lat/lon dicts, got {p!r}")
             else:
                 lat, lon = p  # tuple-like
                 latlons.append({"lat": float(lat), "lon": float(lon)})
-        state = self.store.set_path(latlons, mode=mode)
-        self.broker.publish_str(sse_wrap(state))
+        self.store.mutate_and_publish(self.broker, "path", latlons, mode=mode)
 
     # ----- Server -----
     def run(self, host: str = "0.0.0.0", port: int = 8000, debug: bool = True) -> None:
+        """Serve the app; uses gevent's WSGIServer when the process is gevent-patched.
+
+        With gevent (``monkey.patch_all()`` before importing auv_tracker) each
+        /stream client is a greenlet rather than an OS thread. Otherwise, or in
+        debug mode, this falls back to Flask's threaded development server.
+        """
+        if not debug and _gevent_patched():
+            from gevent.pywsgi import WSGIServer
+            WSGIServer((host, port), self.app).serve_forever()
+            return
         self.app.run(host=host, port=port, debug=debug)
+
+def _gevent_patched() -> bool:
+    # Broker blocks on threading primitives, which only yield to the gevent hub
+    # once threading is monkey-patched; never import gevent ourselves.
+    monkey = sys.modules.get("gevent.monkey")
+    return monkey is not None and monkey.is_module_patched("threading")
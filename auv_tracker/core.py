@@ -1,9 +1,27 @@
 # /auv_tracker/core.py
 from __future__ import annotations
-from dataclasses import dataclass
-from threading import RLock
-from typing import Any, Dict, List, Optional, TypedDict
-from queue import Queue, Empty
+import json
+from json.encoder import encode_basestring_ascii
+from threading import Condition, Lock, Timer
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypedDict
+
+# bound method of one prebuilt encoder: json.dumps(obj, separators=...) would
+# construct a new JSONEncoder on every call
+_std_dumps = json.JSONEncoder(separators=(",", ":")).encode
+
+try:  # optional: compact JSON from a compiled encoder/decoder
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:  # e.g. float subclasses such as numpy.float64
+            return _std_dumps(obj)
+
+    json_loads: Callable[[Any], Any] = orjson.loads
+except ImportError:
+    _dumps = _std_dumps
+    json_loads = json.loads  # both raise a ValueError subclass on bad input
 
 # ---- Types ----
 class LatLon(TypedDict):
@@ -25,85 +43,268 @@ class Target(TypedDict, total=False):
 class StateDict(TypedDict):
     auv: Optional[Auv]
     target: Optional[Target]
-    path: List[LatLon]
+    path: Tuple[LatLon, ...]
 
 # ---- State store ----
-@dataclass
-class State:
-    auv: Optional[Auv]
-    target: Optional[Target]
-    path: List[LatLon]
-
 class StateStore:
-    def __init__(self) -> None:
-        self._state = State(auv=None, target=None, path=[])
-        self._lock = RLock()
+    """Copy-on-write state; snapshots returned by get()/set_* are read-only."""
+    def __init__(self, max_path: int = 10_000) -> None:
+        if max_path < 1:
+            raise ValueError("max_path must be >= 1")  # path[-0:] would keep everything
+        self._max_path = max_path  # append mode keeps only the newest max_path points
+        self._snapshot: StateDict = {"auv": None, "target": None, "path": ()}
+        self._frame: Optional[str] = None  # SSE frame of _snapshot, built lazily
+        self._lock = Lock()
 
     def get(self) -> StateDict:
         with self._lock:
-            s = self._state
-            return {
-                "auv": None if s.auv is None else dict(s.auv),
-                "target": None if s.target is None else dict(s.target),
-                "path": [dict(p) for p in s.path],
-            }
+            return self._snapshot
+
+    def frame(self) -> str:
+        """SSE frame for the current snapshot, encoded at most once per mutation."""
+        with self._lock:
+            return self._frame_locked()
 
     def set_auv(self, auv: Auv) -> StateDict:
         with self._lock:
-            self._state.auv = auv
-            return self.get()
+            return self._replace_locked(auv=auv)
 
     def set_target(self, target: Optional[Target]) -> StateDict:
         with self._lock:
-            self._state.target = target
-            return self.get()
+            return self._replace_locked(target=target)
 
     def set_path(self, points: List[LatLon], mode: str = "replace") -> StateDict:
         with self._lock:
-            if mode == "append":
-                self._state.path.extend(points)
-            else:
-                self._state.path = list(points)
-            return self.get()
+            return self._replace_locked(path=self._path_locked(points, mode))
 
-# ---- SSE Broker ----
-class Broker:
-    """Fan-out broker that keeps at most one pending event per subscriber."""
-    def __init__(self) -> None:
-        self._subs: List[Queue[str]] = []
-        self._lock = RLock()
+    # ----- Fused mutate + serialize (hot path for publishers) -----
+    def set_auv_delta(self, auv: Auv) -> str:
+        """Update the AUV and return only its `auv` delta SSE event.
 
-    def subscribe(self, snapshot: str) -> Queue[str]:
-        q: Queue[str] = Queue(maxsize=1)
+        The full frame is left to be encoded lazily by frame(), i.e. only if a
+        non-delta subscriber or a new subscriber actually needs it. The event is
+        encoded before the snapshot changes, so an unencodable AUV is rejected.
+        """
+        event = sse_auv_event(auv)
         with self._lock:
-            self._subs.append(q)
-        self._put_latest(q, snapshot)
-        return q
+            self._replace_locked(auv=auv)
+        return event
 
-    def unsubscribe(self, q: Queue[str]) -> None:
+    def set_target_and_serialize(self, target: Optional[Target]) -> str:
         with self._lock:
-            try:
-                self._subs.remove(q)
-            except ValueError:
-                pass
+            return self._commit_locked(target=target)
 
-    def publish_str(self, payload: str) -> None:
+    def set_path_and_serialize(self, points: List[LatLon], mode: str = "replace") -> str:
         with self._lock:
-            for q in list(self._subs):
-                self._put_latest(q, payload)
+            return self._commit_locked(path=self._path_locked(points, mode))
 
-    @staticmethod
-    def _put_latest(q: Queue[str], item: str) -> None:
-        try:
-            while True:
-                q.get_nowait()
-        except Empty:
-            pass
-        q.put_nowait(item)
+    def mutate_and_publish(self, broker: Broker, kind: str, arg: Any, mode: str = "replace") -> None:
+        """Apply one mutation and publish it: kind is "auv", "target" or "path".
+
+        The store lock is taken once and the frame encoded once; publishing
+        happens after the lock is released. AUV updates go out as a delta.
+        """
+        if kind == "auv":
+            broker.publish_delta(self.set_auv_delta(arg), self.frame)
+        elif kind == "target":
+            broker.publish_str(self.set_target_and_serialize(arg))
+        elif kind == "path":
+            broker.publish_str(self.set_path_and_serialize(arg, mode=mode))
+        else:
+            raise ValueError(f"unknown kind {kind!r}")
+
+    # ----- Internals; callers must hold _lock (it is not re-entrant) -----
+    def _replace_locked(self, **changes: Any) -> StateDict:
+        self._snapshot = {**self._snapshot, **changes}  # type: ignore[typeddict-item]
+        self._frame = None
+        return self._snapshot
+
+    def _commit_locked(self, **changes: Any) -> str:
+        # encode before swapping in, so a failed encode leaves the state unchanged
+        snapshot: StateDict = {**self._snapshot, **changes}  # type: ignore[typeddict-item]
+        frame = fast_sse(snapshot)
+        self._snapshot, self._frame = snapshot, frame
+        return frame
+
+    def _path_locked(self, points: List[LatLon], mode: str) -> Tuple[LatLon, ...]:
+        if mode == "append":
+            return (self._snapshot["path"] + tuple(points))[-self._max_path:]
+        return tuple(points)
+
+    def _frame_locked(self) -> str:
+        if self._frame is None:
+            self._frame = fast_sse(self._snapshot)
+        return self._frame
+
+# ---- SSE Broker ----
+class Subscriber:
+    """A /stream client's cursor into the broker: the last generation it has seen."""
+    __slots__ = ("broker", "deltas", "gen", "pending")
+
+    def __init__(self, broker: Broker, snapshot: str, gen: int, deltas: bool = False) -> None:
+        self.broker = broker
+        self.deltas = deltas
+        self.gen = gen
+        self.pending: Optional[str] = snapshot  # initial frame, sent on the first wait()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Block until something newer is published; returns None on timeout."""
+        return self.broker._next(self, timeout)
+
+class Broker:
+    """Latest-value broker: subscribers only ever receive the newest frame.
+
+    Each publish bumps a generation counter and overwrites the latest full
+    frame or delta, then wakes all waiters at once; a subscriber compares the
+    stored generations against the last one it saw and skips anything stale.
+    Publishes are coalesced: within a `coalesce_s` window only the latest full
+    frame and the latest delta after it are committed, from a timer thread.
+    `coalesce_s=0` commits synchronously on every publish.
+    """
+    def __init__(self, coalesce_s: float = 0.05) -> None:
+        self._coalesce_s = coalesce_s
+        self._cond = Condition(Lock())
+        # all guarded by _cond
+        self._gen = 0
+        self._full: Tuple[int, str] = (0, "")
+        self._delta: Optional[Tuple[int, str, Callable[[], str]]] = None
+        # a full frame discards any delta published before it
+        self._pending_full: Optional[str] = None
+        self._pending_delta: Optional[Tuple[str, Callable[[], str]]] = None
+        self._flush_scheduled = False
+
+    def subscribe(self, snapshot: str, deltas: bool = False) -> Subscriber:
+        with self._cond:
+            return Subscriber(self, snapshot, self._gen, deltas=deltas)
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        # the broker keeps no per-subscriber state; dropping the cursor is enough
+        sub.pending = None
+
+    def publish_str(self, payload: str) -> None:
+        with self._cond:
+            self._pending_full = payload
+            self._pending_delta = None
+            self._schedule_locked()
+
+    def publish_delta(self, payload: str, full: Callable[[], str]) -> None:
+        """Publish an incremental event; subscribers without deltas get full() instead."""
+        with self._cond:
+            self._pending_delta = (payload, full)
+            self._schedule_locked()
+
+    def _schedule_locked(self) -> None:
+        if self._coalesce_s <= 0:
+            self._commit_locked()
+        elif not self._flush_scheduled:
+            self._flush_scheduled = True
+            timer = Timer(self._coalesce_s, self._flush)
+            timer.daemon = True
+            timer.start()
+
+    def _flush(self) -> None:
+        with self._cond:
+            self._commit_locked()
+
+    def _commit_locked(self) -> None:
+        if self._pending_full is not None:
+            self._gen += 1
+            self._full = (self._gen, self._pending_full)
+        if self._pending_delta is not None:
+            self._gen += 1
+            self._delta = (self._gen, *self._pending_delta)
+        self._pending_full = self._pending_delta = None
+        self._flush_scheduled = False
+        self._cond.notify_all()
+
+    def _next(self, sub: Subscriber, timeout: Optional[float]) -> Optional[str]:
+        with self._cond:
+            if sub.pending is None and not self._cond.wait_for(lambda: self._gen != sub.gen, timeout):
+                return None
+            seen, sub.gen = sub.gen, self._gen
+            full_gen, frame = self._full
+            delta = self._delta
+        chunk, sub.pending = sub.pending or "", None
+        if delta is not None and delta[0] > seen and delta[0] > full_gen:
+            if not sub.deltas:
+                return chunk + delta[2]()  # called outside _cond: it may encode a frame
+            if full_gen > seen:
+                chunk += frame
+            return chunk + delta[1]
+        if full_gen > seen:
+            chunk += frame
+        return chunk
 
 def sse_wrap(obj: Dict[str, Any]) -> str:
-    import json
-    return f"data: {json.dumps(obj, separators=(',', ':'))}\n\n"
+    return f"data: {_dumps(obj)}\n\n"
+
+# ---- Specialised SSE encoder for StateDict ----
+_float_repr = float.__repr__
+_int_repr = int.__repr__
+# (path, encoded path): the path tuple is shared between snapshots until set_path
+# replaces it, so an identity check lets auv/target ticks skip re-encoding it
+_path_memo: Tuple[Tuple[LatLon, ...], str] = ((), "[]")
+
+def _num(x: Any) -> str:
+    cls = x.__class__
+    if cls is float and x - x == 0.0:  # finite float; shortest round-trip repr, as JSON encoders emit
+        return _float_repr(x)
+    if cls is int:
+        return _int_repr(x)
+    raise TypeError("not a JSON-safe number")
+
+def _opt_num(x: Any) -> str:
+    return "null" if x is None else _num(x)
+
+def _encode_path(path: Tuple[LatLon, ...]) -> str:
+    global _path_memo
+    memo = _path_memo
+    if memo[0] is path:
+        return memo[1]
+    out = "[" + ",".join([
+        '{"lat":' + _num(p["lat"]) + ',"lon":' + _num(p["lon"]) + "}" for p in path
+    ]) + "]"
+    _path_memo = (path, out)
+    return out
+
+def _encode_auv(a: Auv) -> str:
+    if len(a) != 5:
+        raise KeyError("auv")
+    return ('{"lat":' + _num(a["lat"]) + ',"lon":' + _num(a["lon"])
+            + ',"alt":' + _opt_num(a["alt"]) + ',"heading":' + _opt_num(a["heading"])
+            + ',"timestamp":' + encode_basestring_ascii(a["timestamp"]) + "}")
+
+def fast_sse(snapshot: StateDict) -> str:
+    """sse_wrap() specialised for the StateDict schema.
+
+    Emits JSON equivalent to sse_wrap's without going through the generic encoder,
+    and reuses the encoded path while it is unchanged. Anything off-schema
+    (extra keys, NaN/inf, non-numeric values) falls back to sse_wrap.
+    """
+    try:
+        a = snapshot["auv"]
+        auv = "null" if a is None else _encode_auv(a)
+        t = snapshot["target"]
+        if t is None:
+            target = "null"
+        elif len(t) == 2:
+            target = '{"lat":' + _num(t["lat"]) + ',"lon":' + _num(t["lon"]) + "}"
+        elif len(t) == 3:
+            target = ('{"lat":' + _num(t["lat"]) + ',"lon":' + _num(t["lon"])
+                      + ',"radius_m":' + _num(t["radius_m"]) + "}")
+        else:
+            raise KeyError("target")
+        path = _encode_path(snapshot["path"])
+    except (KeyError, TypeError):
+        return sse_wrap(snapshot)
+    return 'data: {"auv":' + auv + ',"target":' + target + ',"path":' + path + "}\n\n"
+
+def sse_auv_event(auv: Auv) -> str:
+    """Named `auv` SSE event carrying only the AUV, for delta subscribers."""
+    try:
+        return "event: auv\ndata: " + _encode_auv(auv) + "\n\n"
+    except (KeyError, TypeError):
+        return "event: auv\n" + sse_wrap(auv)  # type: ignore[arg-type]
 
 def validate_latlon(d: Dict[str, Any]) -> LatLon:
     try:
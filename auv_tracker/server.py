@@ -1,11 +1,10 @@
 # /auv_tracker/server.py
 from __future__ import annotations
 from typing import Any, Dict, List, Optional
-from flask import Flask, Response, jsonify, request, send_from_directory
-from queue import Empty, Queue
+from flask import Flask, Response, jsonify, request
 from pathlib import Path
 from .core import (
-    StateStore, Broker, sse_wrap, validate_latlon,
+    StateStore, Broker, Subscriber, json_loads, validate_latlon,
     Auv, Target, LatLon
 )
 
@@ -13,12 +12,14 @@ def create_app(store: StateStore, broker: Broker) -> Flask:
     static_dir = Path(__file__).with_name("static")
     app = Flask(__name__, static_folder=str(static_dir), static_url_path="/static")
 
+    index_bytes = (static_dir / "index.html").read_bytes()  # read once; restart to pick up edits
+
     @app.get("/")
     def index() -> Any:
-        resp = send_from_directory(str(static_dir), "index.html")
-        resp.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-        resp.headers["Pragma"] = "no-cache"
-        return resp
+        return Response(index_bytes, mimetype="text/html", headers={
+            "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
+            "Pragma": "no-cache",
+        })
 
     @app.get("/api/state")
     def api_state() -> Any:
@@ -26,27 +27,31 @@ def create_app(store: StateStore, broker: Broker) -> Flask:
 
     @app.post("/api/auv")
     def api_auv() -> Any:
-        data: Dict[str, Any] = request.get_json(silent=True) or {}
+        # hot endpoint: decode the raw body directly instead of via request.get_json()
+        try:
+            data: Dict[str, Any] = json_loads(request.get_data())
+        except ValueError:
+            return jsonify({"error": "body must be valid JSON"}), 400
         try:
             latlon = validate_latlon(data)
+            alt = data.get("alt")
+            heading = data.get("heading")
             auv: Auv = {
                 **latlon,
-                "alt": float(data["alt"]) if data.get("alt") is not None else None,
-                "heading": float(data["heading"]) if data.get("heading") is not None else None,
+                "alt": None if alt is None else float(alt),
+                "heading": None if heading is None else float(heading),
                 "timestamp": str(data.get("timestamp") or ""),
             }
         except ValueError as e:
             return jsonify({"error": str(e)}), 400
-        state = store.set_auv(auv)
-        broker.publish_str(sse_wrap(state))
+        store.mutate_and_publish(broker, "auv", auv)
         return "", 204
 
     @app.post("/api/target")
     def api_target() -> Any:
         data: Dict[str, Any] = request.get_json(silent=True) or {}
         if data in ({}, None) or data.get("clear"):
-            state = store.set_target(None)
-            broker.publish_str(sse_wrap(state))
+            store.mutate_and_publish(broker, "target", None)
             return "", 204
 
         try:
@@ -67,8 +72,7 @@ def create_app(store: StateStore, broker: Broker) -> Flask:
         if r is not None:
             target["radius_m"] = r
 
-        state = store.set_target(target)
-        broker.publish_str(sse_wrap(state))
+        store.mutate_and_publish(broker, "target", target)
         return "", 204
 
     @app.post("/api/path")
@@ -89,31 +93,28 @@ def create_app(store: StateStore, broker: Broker) -> Flask:
         except ValueError as e:
             return jsonify({"error": str(e)}), 400
 
-        state = store.set_path(points, mode=mode)
-        broker.publish_str(sse_wrap(state))
+        store.mutate_and_publish(broker, "path", points, mode=mode)
         return "", 204
 
     @app.get("/stream")
     def stream() -> Response:
-        def event_stream(q: Queue[str]):
+        def event_stream(sub: Subscriber):
             try:
                 while True:
-                    try:
-                        chunk = q.get(timeout=15.0)
-                        yield chunk
-                    except Empty:
-                        yield ": keep-alive\n\n"
+                    chunk = sub.wait(timeout=15.0)
+                    yield ": keep-alive\n\n" if chunk is None else chunk
             finally:
-                broker.unsubscribe(q)
+                broker.unsubscribe(sub)
 
-        snapshot = sse_wrap(store.get())
-        q = broker.subscribe(snapshot)
+        # ?deltas=1: after the first full frame, AUV updates arrive as `auv` events
+        deltas = request.args.get("deltas", "").lower() in {"1", "true"}
+        sub = broker.subscribe(store.frame(), deltas=deltas)
         headers = {
             "Content-Type": "text/event-stream",
             "Cache-Control": "no-cache, no-transform",
             "Connection": "keep-alive",
             "X-Accel-Buffering": "no",
         }
-        return Response(event_stream(q), headers=headers)
+        return Response(event_stream(sub), headers=headers)
 
     return app
\ No newline at end of file
@@ -0,0 +1,155 @@
+from __future__ import annotations
+import json
+
+import pytest
+
+from auv_tracker import AuvTracker
+from auv_tracker import core
+from auv_tracker.core import Broker, StateStore, fast_sse, sse_wrap
+
+
+class _Float(float):
+    """Stand-in for float subclasses such as numpy.float64."""
+
+
+def _data(frame: str) -> dict:
+    return json.loads(frame.split("data: ", 1)[1])
+
+
+def test_sse_wrap_accepts_float_subclasses() -> None:
+    assert _data(sse_wrap({"alt": _Float(1.5)})) == {"alt": 1.5}
+
+
+def test_set_auv_with_float_subclass_keeps_tracker_usable() -> None:
+    tracker = AuvTracker()
+    tracker.set_auv(lat=_Float(1.0), lon=2.0, alt=_Float(3.0), heading=_Float(4.0))
+    tracker.set_target(lat=5.0, lon=6.0)
+    state = _data(tracker.store.frame())
+    assert state["auv"]["alt"] == 3.0 and state["auv"]["heading"] == 4.0
+    assert state["target"] == {"lat": 5.0, "lon": 6.0}
+
+
+def test_store_frame_with_float_subclass_in_snapshot() -> None:
+    store = StateStore()
+    store.set_auv({"lat": 1.0, "lon": 2.0, "alt": _Float(3.0), "heading": None, "timestamp": ""})
+    assert _data(store.frame())["auv"]["alt"] == 3.0
+
+
+def test_failed_encode_leaves_state_unchanged() -> None:
+    store = StateStore()
+    store.set_target_and_serialize({"lat": 1.0, "lon": 2.0})
+    before = store.get()
+    with pytest.raises(TypeError):
+        store.set_target_and_serialize({"lat": object(), "lon": 2.0})  # type: ignore[typeddict-item]
+    with pytest.raises(TypeError):
+        store.set_auv_delta({"lat": object(), "lon": 2.0, "alt": None, "heading": None, "timestamp": ""})  # type: ignore[typeddict-item]
+    assert store.get() is before
+    assert _data(store.frame())["target"] == {"lat": 1.0, "lon": 2.0}
+
+
+def test_set_path_rejects_sets_but_accepts_ordered_pairs() -> None:
+    tracker = AuvTracker()
+    with pytest.raises(TypeError):
+        tracker.set_path([{32.1, 34.7}])
+    tracker.set_path([(1, 2), [3, 4], iter((5, 6)), {"lat": 7, "lon": 8}])
+    assert [(p["lat"], p["lon"]) for p in tracker.get_state()["path"]] == [(1, 2), (3, 4), (5, 6), (7, 8)]
+
+
+def test_append_keeps_newest_max_path_points() -> None:
+    store = StateStore(max_path=2)
+    store.set_path([{"lat": float(i), "lon": 0.0} for i in range(5)], mode="append")
+    assert [p["lat"] for p in store.get()["path"]] == [3.0, 4.0]
+    with pytest.raises(ValueError):
+        StateStore(max_path=0)
+
+
+def test_first_wait_returns_snapshot_then_times_out() -> None:
+    broker = Broker(coalesce_s=0)
+    sub = broker.subscribe("data: snap\n\n")
+    assert sub.wait(timeout=0) == "data: snap\n\n"
+    assert sub.wait(timeout=0.01) is None
+
+
+def test_delta_subscriber_gets_full_frame_then_newer_delta() -> None:
+    broker = Broker(coalesce_s=0)
+    sub = broker.subscribe("snap", deltas=True)
+    sub.wait(timeout=0)
+    broker.publish_delta("event: auv\ndata: 1\n\n", lambda: "full-1")
+    broker.publish_str("data: target\n\n")
+    broker.publish_delta("event: auv\ndata: 2\n\n", lambda: "full-2")
+    assert sub.wait(timeout=0) == "data: target\n\nevent: auv\ndata: 2\n\n"
+    assert sub.wait(timeout=0.01) is None
+
+
+def test_plain_subscriber_gets_fresh_full_frame_instead_of_delta() -> None:
+    broker = Broker(coalesce_s=0)
+    sub = broker.subscribe("snap")
+    sub.wait(timeout=0)
+    broker.publish_str("data: target\n\n")
+    broker.publish_delta("event: auv\ndata: 2\n\n", lambda: "data: full-2\n\n")
+    assert sub.wait(timeout=0) == "data: full-2\n\n"
+
+
+def test_delta_older_than_latest_full_frame_is_skipped() -> None:
+    broker = Broker(coalesce_s=0)
+    sub = broker.subscribe("snap", deltas=True)
+    sub.wait(timeout=0)
+    broker.publish_delta("event: auv\ndata: 1\n\n", lambda: "full-1")
+    broker.publish_str("data: target\n\n")
+    assert sub.wait(timeout=0) == "data: target\n\n"
+    assert sub.wait(timeout=0.01) is None
+
+
+def test_burst_of_set_auv_is_coalesced_into_latest_update() -> None:
+    tracker = AuvTracker()
+    sub = tracker.broker.subscribe(tracker.store.frame(), deltas=True)
+    sub.wait(timeout=0)
+    for i in range(100):
+        tracker.set_auv(lat=0.0, lon=0.0, timestamp=str(i))
+    chunk = sub.wait(timeout=1.0)
+    assert chunk is not None and chunk.count("\n\n") == 1
+    assert chunk.startswith("event: auv\n") and _data(chunk)["timestamp"] == "99"
+    assert sub.wait(timeout=0.2) is None
+
+
+def test_full_frame_in_window_is_committed_before_newer_delta() -> None:
+    broker = Broker()
+    sub = broker.subscribe("snap", deltas=True)
+    sub.wait(timeout=0)
+    broker.publish_delta("event: auv\ndata: 1\n\n", lambda: "full-1")
+    broker.publish_str("data: target\n\n")
+    broker.publish_delta("event: auv\ndata: 2\n\n", lambda: "full-2")
+    assert sub.wait(timeout=1.0) == "data: target\n\nevent: auv\ndata: 2\n\n"
+    assert sub.wait(timeout=0.2) is None
+
+
+_AUV = {"lat": 32.1, "lon": -34.25, "alt": 1.5, "heading": 90, "timestamp": "2026-01-01T00:00:00+00:00"}
+_PATH = ({"lat": 1.0, "lon": 2.0}, {"lat": -3.5, "lon": 4.25})
+
+
+def _canonical(frame: str) -> str:
+    # re-dump so NaN compares equal to itself
+    return json.dumps(_data(frame), sort_keys=True)
+
+
+@pytest.mark.parametrize("snapshot", [
+    {"auv": None, "target": None, "path": ()},
+    {"auv": _AUV, "target": {"lat": 1.0, "lon": 2.0}, "path": _PATH},
+    {"auv": _AUV, "target": {"lat": 1.0, "lon": 2.0, "radius_m": 300.0}, "path": ()},
+    {"auv": {**_AUV, "timestamp": 'é "quoted" ☃'}, "target": None, "path": ()},
+    {"auv": {**_AUV, "lat": True}, "target": None, "path": ()},
+    {"auv": {**_AUV, "alt": float("nan")}, "target": None, "path": ()},
+    {"auv": {k: v for k, v in _AUV.items() if k != "heading"}, "target": None, "path": _PATH},
+], ids=["none", "target", "target-radius", "timestamp-escapes", "bool-coord", "nan-alt", "missing-key"])
+def test_fast_sse_matches_sse_wrap(snapshot: dict) -> None:
+    assert _canonical(fast_sse(snapshot)) == _canonical(sse_wrap(snapshot))
+
+
+def test_fast_sse_reuses_path_after_auv_only_mutation() -> None:
+    store = StateStore()
+    store.set_path_and_serialize(list(_PATH))
+    path = store.get()["path"]
+    store.mutate_and_publish(Broker(coalesce_s=0), "auv", dict(_AUV))
+    frame = store.frame()
+    assert store.get()["path"] is path and core._path_memo[0] is path
+    assert _canonical(frame) == _canonical(sse_wrap(store.get()))